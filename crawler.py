@@ -1,36 +1,72 @@
 import os
+import csv
 import asyncio
 from crawl4ai import BrowserConfig, CrawlerRunConfig, CacheMode
-from crawl4ai import AsyncWebCrawler, RateLimiter, SemaphoreDispatcher, CrawlerMonitor, DisplayMode
-import pandas as pd
-
-async def crawl_with_semaphore(urls):
-    browser_config = BrowserConfig(headless=True, verbose=False)
-    run_config = CrawlerRunConfig(cache_mode=CacheMode.BYPASS)
-
-    dispatcher = SemaphoreDispatcher(
-        max_session_permit=60,
-        rate_limiter=RateLimiter(
-            base_delay=(2.0, 4.0),
-            max_delay=10.0,
-            max_retries=3,
-            rate_limit_codes=[429, 503] 
-        ),
-        monitor=CrawlerMonitor()
-    )
-
-    async with AsyncWebCrawler(config=browser_config) as crawler:
-        results = await crawler.arun_many(
-            urls, 
-            config=run_config,
+from crawl4ai import AsyncWebCrawler, RateLimiter, MemoryAdaptiveDispatcher, CrawlerMonitor, DisplayMode
+
+class CrawlerService:
+    """Long-lived crawler that reuses one browser instance across crawl calls."""
+
+    def __init__(self):
+        self.browser_config = BrowserConfig(
+            headless=True,
+            verbose=False,
+            text_mode=True,
+            light_mode=True,
+            extra_args=["--disable-dev-shm-usage"]
+        )
+        self.run_config = CrawlerRunConfig(cache_mode=CacheMode.BYPASS)
+        self.crawler = None
+
+    async def __aenter__(self):
+        self.crawler = AsyncWebCrawler(config=self.browser_config)
+        await self.crawler.__aenter__()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.crawler.__aexit__(exc_type, exc, tb)
+        self.crawler = None
+
+    async def crawl(self, urls):
+        dispatcher = MemoryAdaptiveDispatcher(
+            memory_threshold_percent=75.0,
+            max_session_permit=60,
+            rate_limiter=RateLimiter(
+                base_delay=(2.0, 4.0),
+                max_delay=10.0,
+                max_retries=3,
+                rate_limit_codes=[429, 503]
+            ),
+            monitor=CrawlerMonitor()
+        )
+        return await self.crawler.arun_many(
+            urls,
+            config=self.run_config,
             dispatcher=dispatcher
         )
-        return results
+
+async def crawl_urls(urls):
+    async with CrawlerService() as service:
+        return await service.crawl(urls)
 
 def main(data_loc):
-    data = pd.read_csv(data_loc)
-    urls = data['URL'].tolist()
-    results = asyncio.run(crawl_with_semaphore(urls))
+    with open(data_loc, newline='') as f:
+        urls = [row['URL'] for row in csv.DictReader(f)]
+    # The search step often returns the same page for several programs;
+    # crawl each URL once and fan the results back out to the rows.
+    unique_urls = list(dict.fromkeys(urls))
+    crawled = asyncio.run(crawl_urls(unique_urls))
+    # arun_many returns results in completion order, not input order, so
+    # key the fan-out on the URLs each result carries. Indexing both the
+    # result URL and its redirect counterpart reattaches redirected
+    # results to the row that requested them; rows with no match stay
+    # None rather than being guessed by position.
+    url_to_result = {}
+    for result in crawled:
+        for key in (result.url, getattr(result, 'redirected_url', None)):
+            if key:
+                url_to_result.setdefault(key, result)
+    results = [url_to_result.get(url) for url in urls]
     print(results[1].markdown)
 
 
@@ -1,28 +1,41 @@
 import os
-import requests
-import pandas as pd
+import csv
+import asyncio
+import httpx
 
-def main():
-    df = pd.read_csv('output.csv')
-    current_dir = os.getcwd()
-    for idx, row in df.iterrows():
-        pdf_url = row['URL']
-        university = row['University'].strip()
-        program = row['Program'].strip()
-        file_name = pdf_url.split("/")[-1]
-        path = os.path.join(current_dir, university, program)
-        if not os.path.exists(path):
-            os.makedirs(path)
-        file_name = os.path.join(path, file_name)
-        os.chdir(path)
+CONCURRENT_DOWNLOADS = 15
+
+async def download(client, sem, pdf_url, path):
+    file_name = os.path.join(path, pdf_url.split("/")[-1])
+    async with sem:
         try:
-            os.system(f"curl -O {pdf_url}")
-        except:
-            os.system(f"wget '{pdf_url}' ")
-            
-        # with open(file_name, "wb") as f_out:
-        #     print("Downloading", pdf_url)
-        #     f_out.write(requests.get(pdf_url).content)
+            async with client.stream("GET", pdf_url) as r:
+                r.raise_for_status()
+                with open(file_name, "wb") as f_out:
+                    async for chunk in r.aiter_bytes(chunk_size=1 << 16):
+                        f_out.write(chunk)
+            print("Downloaded", pdf_url)
+        except Exception as e:
+            print(f"Failed to download {pdf_url}: {e}")
+
+async def download_all(rows):
+    sem = asyncio.Semaphore(CONCURRENT_DOWNLOADS)
+    limits = httpx.Limits(max_connections=50, max_keepalive_connections=20)
+    current_dir = os.getcwd()
+    targets = [
+        (row['URL'], os.path.join(current_dir, row['University'].strip(), row['Program'].strip()))
+        for row in rows
+    ]
+    # Many rows share a (university, program) directory; create each once.
+    for path in {path for _, path in targets}:
+        os.makedirs(path, exist_ok=True)
+    async with httpx.AsyncClient(limits=limits, http2=True, timeout=30.0, follow_redirects=True) as client:
+        await asyncio.gather(*[download(client, sem, pdf_url, path) for pdf_url, path in targets])
+
+def main():
+    with open('output.csv', newline='') as f:
+        rows = list(csv.DictReader(f))
+    asyncio.run(download_all(rows))
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -1,28 +1,50 @@
 import os
+import asyncio
 import pandas as pd
-from tavily import TavilyClient
+from tavily import AsyncTavilyClient
 import json
 
 CSV_FILE = 'University Data - Sheet1.csv'
 TAVILY_API_KEY = os.getenv("TAVILY_API_KEY")
+CONCURRENT_SEARCHES = 32
+MAX_RETRIES = 3
 
-def search_tavily(row):
-    client = TavilyClient(TAVILY_API_KEY)
+# One client for the whole process so every search shares its
+# keep-alive connection pool
+client = AsyncTavilyClient(TAVILY_API_KEY)
+
+async def search_tavily(sem, row):
     university = row['University'].strip()
     program = row['Program'].strip()
     query = f"{university} {program} Graduate handbook 24-25 academic year pdf"
-    response = client.search(
-        query=query
-    )
+    response = None
+    async with sem:
+        for attempt in range(MAX_RETRIES):
+            try:
+                response = await client.search(
+                    query=query
+                )
+                break
+            except Exception as e:
+                if attempt == MAX_RETRIES - 1:
+                    print(f"Search failed for {university} - {program}: {e}")
+                    return query, str(e)
+                await asyncio.sleep(2 ** attempt)
     url = response['results'][0]['url']
     title = response['results'][0]['title']
     print(f"Completed for {university} - {program}")
-    return pd.Series([title, url])
+    return title, url
+
+async def search_all(data):
+    sem = asyncio.Semaphore(CONCURRENT_SEARCHES)
+    return await asyncio.gather(*[search_tavily(sem, row) for _, row in data.iterrows()])
 
 def main():
     data = pd.read_csv(CSV_FILE)
-    data[['Title', 'URL']] = data.apply(search_tavily, axis=1)
+    results = asyncio.run(search_all(data))
+    data['Title'] = [title for title, _ in results]
+    data['URL'] = [url for _, url in results]
     data.to_csv('output.csv', index=False)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -13,17 +13,29 @@ Example:
     python sitemap_crawler.py https://university.edu
 """
 
+import io
+import gzip
+import time
+import asyncio
+import aiohttp
 import requests
-import xml.etree.ElementTree as ET
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from lxml import etree
 from urllib.parse import urljoin, urlparse, parse_qs
 from urllib.robotparser import RobotFileParser
-import time
+import os
 import logging
 from typing import Set, List, Dict, Optional
 import re
 from dataclasses import dataclass
-from concurrent.futures import ThreadPoolExecutor, as_completed
-import threading
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import hyperscan
+    HAS_HYPERSCAN = True
+except ImportError:
+    HAS_HYPERSCAN = False
 
 # Configure logging
 logging.basicConfig(
@@ -32,6 +44,54 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Fused PDF pattern, kept for callers that need a regex; the hot path in
+# is_pdf_url uses plain string tests instead
+_PDF_RE = re.compile(r'\.pdf(?:\?|$)', re.IGNORECASE)
+
+if HAS_HYPERSCAN:
+    # SIMD multi-pattern matcher for URL classification; one compiled
+    # database shared by all crawler instances
+    _HS_DB = hyperscan.Database()
+    _HS_DB.compile(
+        expressions=[rb'\.pdf(\?|$)'],
+        ids=[1],
+        flags=[hyperscan.HS_FLAG_CASELESS],
+    )
+
+    def _match_pdf(url_bytes: bytes) -> bool:
+        matched = False
+
+        def _on_match(pattern_id, start, end, flags, context=None):
+            nonlocal matched
+            matched = True
+
+        _HS_DB.scan(url_bytes, match_event_handler=_on_match)
+        return matched
+else:
+    def _match_pdf(url_bytes: bytes) -> bool:
+        return _PDF_RE.search(url_bytes.decode('utf-8', 'replace')) is not None
+
+# Namespace-qualified tag names built once; the parse loop otherwise
+# reformats these strings for every element
+_SITEMAP_NS = 'http://www.sitemaps.org/schemas/sitemap/0.9'
+_URL_TAG = f'{{{_SITEMAP_NS}}}url'
+_SITEMAP_TAG = f'{{{_SITEMAP_NS}}}sitemap'
+_LOC_TAG = f'{{{_SITEMAP_NS}}}loc'
+
+# Common sitemap locations, probed once per crawl
+_SITEMAP_LOCATIONS = (
+    '/sitemap.xml',
+    '/sitemap.xml.gz',
+    '/sitemap_index.xml',
+    '/sitemap_index.xml.gz',
+    '/sitemaps.xml',
+    '/sitemap/',
+    '/wp-sitemap.xml',  # WordPress
+    '/sitemap-index.xml',
+)
+
+_USER_AGENT = 'Mozilla/5.0 (compatible; SitemapCrawler/1.0)'
+
 @dataclass
 class SitemapResult:
     """Container for sitemap crawling results"""
@@ -45,48 +105,58 @@ class SitemapCrawler:
     A recursive sitemap crawler that finds PDF URLs across university websites
     """
     
-    def __init__(self, base_url: str, max_workers: int = 5, delay: float = 1.0):
+    def __init__(self, base_url: str, max_workers: Optional[int] = None, delay: float = 1.0,
+                 max_concurrency: int = 100):
         """
         Initialize the crawler
-        
+
         Args:
             base_url: The homepage URL to start crawling from
-            max_workers: Maximum number of concurrent threads
+            max_workers: Number of threads for XML parsing (default: one per core)
             delay: Delay between requests in seconds
+            max_concurrency: Maximum number of concurrent sitemap fetches
         """
         self.base_url = base_url.rstrip('/')
         self.domain = urlparse(base_url).netloc
-        self.max_workers = max_workers
+        # lxml releases the GIL while parsing, so the parse threads scale
+        # across real cores; default to one thread per core
+        self.max_workers = max_workers or (os.cpu_count() or 4)
         self.delay = delay
-        
-        # Thread-safe sets for tracking progress
-        self._lock = threading.Lock()
+        self.max_concurrency = max_concurrency
+
+        # Precomputed netloc variants so _is_same_domain is one hash lookup
+        bare_domain = self.domain[4:] if self.domain.startswith('www.') else self.domain
+        self._allowed_netlocs = frozenset({self.domain, bare_domain, f"www.{bare_domain}"})
+
+        # Sets for tracking progress (mutated only on the event loop).
+        # visited_sitemaps gates enqueuing: a URL goes onto the queue at
+        # most once, ever, so no separate pending set is needed.
         self.pdf_urls = set()
         self.processed_sitemaps = set()
-        self.pending_sitemaps = set()
+        self.visited_sitemaps = set()
         self.errors = []
+
+        # Per-host politeness: earliest monotonic time the next request to
+        # each netloc may fire (mutated only on the event loop)
+        self._next_request_at = {}
         
-        # Common sitemap locations
-        self.sitemap_locations = [
-            '/sitemap.xml',
-            '/sitemap_index.xml',
-            '/sitemaps.xml',
-            '/sitemap/',
-            '/wp-sitemap.xml',  # WordPress
-            '/sitemap-index.xml'
-        ]
-        
-        # PDF file patterns
-        self.pdf_patterns = [
-            re.compile(r'\.pdf$', re.IGNORECASE),
-            re.compile(r'\.pdf\?', re.IGNORECASE),  # PDFs with query parameters
-        ]
-        
-        # Session for connection pooling
+        # Session for connection pooling; the adapter pool is sized to the
+        # worker count so parallel probes never churn connections, and
+        # transient errors retry with backoff instead of surfacing
         self.session = requests.Session()
         self.session.headers.update({
-            'User-Agent': 'Mozilla/5.0 (compatible; SitemapCrawler/1.0)'
+            'User-Agent': _USER_AGENT,
+            'Accept-Encoding': 'gzip, br, deflate'
         })
+        pool_size = max(self.max_workers * 4, len(_SITEMAP_LOCATIONS))
+        adapter = HTTPAdapter(
+            pool_connections=pool_size,
+            pool_maxsize=pool_size,
+            max_retries=Retry(total=3, backoff_factor=0.3,
+                              status_forcelist=[429, 500, 502, 503, 504])
+        )
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
     
     def get_robots_txt_sitemaps(self) -> List[str]:
         """
@@ -113,30 +183,48 @@ class SitemapCrawler:
         
         return sitemaps
     
+    def _probe_head(self, sitemap_url: str) -> Optional[str]:
+        """
+        HEAD one candidate sitemap location
+
+        Args:
+            sitemap_url: Candidate sitemap URL
+
+        Returns:
+            The URL if it answered 200, otherwise None
+        """
+        try:
+            response = self.session.head(sitemap_url, timeout=10)
+            if response.status_code == 200:
+                logger.info(f"Found sitemap at: {sitemap_url}")
+                return sitemap_url
+        except Exception as e:
+            logger.debug(f"No sitemap at {sitemap_url}: {e}")
+        return None
+
     def discover_sitemaps(self) -> List[str]:
         """
         Discover sitemap URLs using common locations and robots.txt
-        
+
+        The common-location probes all fire in parallel over the session's
+        connection pool, so discovery costs about one round-trip instead of
+        up to six serial HEAD requests.
+
         Returns:
             List of discovered sitemap URLs
         """
         sitemaps = []
-        
+
         # Check robots.txt first
         sitemaps.extend(self.get_robots_txt_sitemaps())
-        
-        # Check common sitemap locations
-        for location in self.sitemap_locations:
-            sitemap_url = urljoin(self.base_url, location)
-            try:
-                response = self.session.head(sitemap_url, timeout=10)
-                if response.status_code == 200:
-                    sitemaps.append(sitemap_url)
-                    logger.info(f"Found sitemap at: {sitemap_url}")
-            except Exception as e:
-                logger.debug(f"No sitemap at {sitemap_url}: {e}")
-        
-        return list(set(sitemaps))  # Remove duplicates
+
+        # Probe common sitemap locations in parallel
+        candidates = [urljoin(self.base_url, location) for location in _SITEMAP_LOCATIONS]
+        with ThreadPoolExecutor(max_workers=len(candidates)) as executor:
+            sitemaps.extend(url for url in executor.map(self._probe_head, candidates) if url)
+
+        # Remove duplicates, keeping robots.txt entries first
+        return list(dict.fromkeys(sitemaps))
     
     def is_pdf_url(self, url: str) -> bool:
         """
@@ -148,86 +236,147 @@ class SitemapCrawler:
         Returns:
             True if URL appears to be a PDF
         """
-        return any(pattern.search(url) for pattern in self.pdf_patterns)
+        # Called once per URL across potentially millions of entries, so
+        # plain string tests beat the regex engine here
+        url = url.lower()
+        return url.endswith('.pdf') or '.pdf?' in url
     
-    def parse_sitemap(self, sitemap_url: str) -> Dict[str, Set[str]]:
+    async def parse_sitemap(self, http, sitemap_url: str) -> Dict[str, Set[str]]:
         """
-        Parse a single sitemap and extract URLs
-        
+        Fetch a single sitemap and extract URLs
+
+        The fetch runs on the shared aiohttp session; the CPU-bound XML
+        parse is pushed to the parse thread pool so the event loop keeps
+        dispatching requests.
+
         Args:
+            http: Shared aiohttp.ClientSession
             sitemap_url: URL of the sitemap to parse
-            
+
         Returns:
             Dictionary with 'urls', 'sitemaps', and 'pdfs' keys
         """
         result = {'urls': set(), 'sitemaps': set(), 'pdfs': set()}
-        
+
         try:
             logger.info(f"Parsing sitemap: {sitemap_url}")
-            response = self.session.get(sitemap_url, timeout=15)
-            response.raise_for_status()
-            
-            # Parse XML content
-            try:
-                root = ET.fromstring(response.content)
-            except ET.ParseError as e:
-                logger.error(f"XML parsing error for {sitemap_url}: {e}")
-                return result
-            
-            # Handle different sitemap formats
-            namespaces = {
-                'sitemap': 'http://www.sitemaps.org/schemas/sitemap/0.9'
-            }
-            
-            # Check if this is a sitemap index
-            sitemap_elements = root.findall('.//sitemap:sitemap', namespaces)
-            if sitemap_elements:
-                logger.info(f"Found sitemap index with {len(sitemap_elements)} sitemaps")
-                for sitemap_elem in sitemap_elements:
-                    loc_elem = sitemap_elem.find('sitemap:loc', namespaces)
-                    if loc_elem is not None and loc_elem.text:
-                        nested_sitemap_url = loc_elem.text.strip()
-                        if self._is_same_domain(nested_sitemap_url):
-                            result['sitemaps'].add(nested_sitemap_url)
-            
-            # Check for regular URL entries
-            url_elements = root.findall('.//sitemap:url', namespaces)
-            if url_elements:
-                logger.info(f"Found {len(url_elements)} URLs in sitemap")
-                for url_elem in url_elements:
-                    loc_elem = url_elem.find('sitemap:loc', namespaces)
-                    if loc_elem is not None and loc_elem.text:
-                        url = loc_elem.text.strip()
-                        if self._is_same_domain(url):
-                            result['urls'].add(url)
-                            if self.is_pdf_url(url):
-                                result['pdfs'].add(url)
-            
-            # Fallback: try to parse as plain text list of URLs
-            if not sitemap_elements and not url_elements:
-                logger.info("Trying to parse as plain text URL list")
-                lines = response.text.split('\n')
-                for line in lines:
-                    line = line.strip()
-                    if line.startswith('http') and self._is_same_domain(line):
-                        result['urls'].add(line)
-                        if self.is_pdf_url(line):
-                            result['pdfs'].add(line)
-        
-        except requests.RequestException as e:
+            async with http.get(sitemap_url) as response:
+                response.raise_for_status()
+                content_type = response.headers.get('Content-Type', '')
+                body = await response.read()
+
+            loop = asyncio.get_running_loop()
+            await loop.run_in_executor(
+                self._parse_pool, self._parse_body, sitemap_url, body, content_type, result
+            )
+
+        except aiohttp.ClientError as e:
             error_msg = f"Request error for {sitemap_url}: {e}"
             logger.error(error_msg)
-            with self._lock:
-                self.errors.append(error_msg)
-        
+            self.errors.append(error_msg)
+
         except Exception as e:
             error_msg = f"Unexpected error parsing {sitemap_url}: {e}"
             logger.error(error_msg)
-            with self._lock:
-                self.errors.append(error_msg)
-        
+            self.errors.append(error_msg)
+
         return result
-    
+
+    def _parse_body(self, sitemap_url: str, body: bytes, content_type: str,
+                    result: Dict[str, Set[str]]):
+        """
+        Dispatch a fetched sitemap body to the XML or plain-text parser
+
+        Non-XML responses (an HTML 404 served with 200, a WAF block page)
+        are rejected with a cheap header/byte check before the XML parser
+        ever spins up, instead of paying for parser setup plus an
+        exception unwind.
+
+        Args:
+            sitemap_url: URL of the sitemap being parsed (for logging)
+            body: raw response body
+            content_type: Content-Type header of the response
+            result: result dictionary to fill in place
+        """
+        content_type = content_type.split(';', 1)[0].strip().lower()
+        head = body[:512]
+        # A UTF-8 BOM is legal before the XML declaration but would fail
+        # the prefix sniff below; lstrip() does not remove it
+        if head[:3] == b'\xef\xbb\xbf':
+            head = head[3:]
+        head = head.lstrip()
+        if body[:2] == b'\x1f\x8b':
+            # .xml.gz sitemap delivered as-is (no Content-Encoding header);
+            # GzipFile decompresses incrementally as iterparse reads
+            self._parse_xml_stream(sitemap_url, gzip.GzipFile(fileobj=io.BytesIO(body)), result)
+        elif (content_type in ('application/xml', 'text/xml')
+                or head[:5] in (b'<?xml', b'<urls', b'<site')):
+            self._parse_xml_stream(sitemap_url, io.BytesIO(body), result)
+        elif head.startswith(b'<'):
+            # Markup that is neither a sitemap nor a sitemap index
+            logger.info(f"Skipping non-XML response ({content_type or 'unknown type'}) from {sitemap_url}")
+        else:
+            # Fallback: parse as plain text list of URLs. Lines are walked
+            # lazily at the byte level; only candidate URLs get decoded, so
+            # a 50MB body never materializes a second full string/list.
+            logger.info("Trying to parse as plain text URL list")
+            for raw_line in io.BytesIO(body):
+                raw_line = raw_line.strip()
+                if not raw_line.startswith(b'http'):
+                    continue
+                line = raw_line.decode('utf-8', 'replace')
+                if self._is_same_domain(line):
+                    result['urls'].add(line)
+                    if _match_pdf(raw_line):
+                        result['pdfs'].add(line)
+
+    def _parse_xml_stream(self, sitemap_url: str, stream, result: Dict[str, Set[str]]):
+        """
+        Incrementally parse sitemap XML from a byte stream
+
+        Uses lxml iterparse so huge sitemaps never materialize a full DOM:
+        each <url>/<sitemap> element is handled as soon as its end tag
+        arrives and then freed. The fetch path buffers the whole response
+        body before handing it here, so peak memory is one body plus the
+        element being processed rather than the full element tree. Each
+        call owns its parser and lxml drops the GIL while parsing, so
+        concurrent calls from the parse pool run on separate cores.
+
+        Args:
+            sitemap_url: URL of the sitemap being parsed (for logging)
+            stream: file-like object yielding the decoded response body
+            result: result dictionary to fill in place
+        """
+        try:
+            for event, elem in etree.iterparse(
+                stream,
+                events=('end',),
+                tag=(_URL_TAG, _SITEMAP_TAG),
+                recover=True,
+                huge_tree=True,
+            ):
+                loc = elem.findtext(_LOC_TAG)
+                if loc:
+                    loc = loc.strip()
+                    if self._is_same_domain(loc):
+                        if elem.tag == _SITEMAP_TAG:
+                            result['sitemaps'].add(loc)
+                        else:
+                            result['urls'].add(loc)
+                            if self.is_pdf_url(loc):
+                                result['pdfs'].add(loc)
+                # Free the element and any completed siblings ahead of it
+                elem.clear()
+                while elem.getprevious() is not None:
+                    del elem.getparent()[0]
+        except etree.XMLSyntaxError as e:
+            logger.error(f"XML parsing error for {sitemap_url}: {e}")
+            return
+        if result['sitemaps']:
+            logger.info(f"Found sitemap index with {len(result['sitemaps'])} sitemaps")
+        if result['urls']:
+            logger.info(f"Found {len(result['urls'])} URLs in sitemap")
+
     def _is_same_domain(self, url: str) -> bool:
         """
         Check if URL belongs to the same domain
@@ -239,85 +388,117 @@ class SitemapCrawler:
             True if URL is from the same domain
         """
         try:
-            parsed_url = urlparse(url)
-            return parsed_url.netloc == self.domain or parsed_url.netloc == f"www.{self.domain}" or parsed_url.netloc == self.domain.replace("www.", "")
+            return urlparse(url).netloc in self._allowed_netlocs
         except:
             return False
     
-    def crawl_sitemap_worker(self, sitemap_url: str):
+    async def _throttle(self, sitemap_url: str):
         """
-        Worker function to crawl a single sitemap
-        
+        Space out requests per host instead of delaying every worker
+
+        Each netloc gets its own reservation slot self.delay seconds after
+        the previous one, so politeness toward one host never stalls
+        fetches from the others. Runs entirely on the event loop, so no
+        lock is needed around the bookkeeping.
+
         Args:
-            sitemap_url: URL of sitemap to crawl
+            sitemap_url: URL about to be fetched
         """
-        if sitemap_url in self.processed_sitemaps:
+        if self.delay <= 0:
             return
-        
-        # Add delay to be respectful
-        time.sleep(self.delay)
-        
-        # Parse the sitemap
-        result = self.parse_sitemap(sitemap_url)
-        
-        # Update shared state thread-safely
-        with self._lock:
-            self.processed_sitemaps.add(sitemap_url)
-            self.pdf_urls.update(result['pdfs'])
-            
-            # Add newly discovered sitemaps to pending list
-            new_sitemaps = result['sitemaps'] - self.processed_sitemaps - self.pending_sitemaps
-            self.pending_sitemaps.update(new_sitemaps)
-        
-        logger.info(f"Processed {sitemap_url}: found {len(result['pdfs'])} PDFs, {len(result['sitemaps'])} nested sitemaps")
-    
+        host = urlparse(sitemap_url).netloc
+        now = time.monotonic()
+        ready = self._next_request_at.get(host, now)
+        self._next_request_at[host] = max(ready, now) + self.delay
+        if ready > now:
+            await asyncio.sleep(ready - now)
+
+    async def crawl_sitemap_worker(self, http, queue: "asyncio.Queue"):
+        """
+        Queue consumer: crawl sitemaps until cancelled
+
+        Newly discovered sitemaps go straight back onto the queue, so
+        discovery and parsing pipeline together with no wave boundaries.
+
+        Args:
+            http: Shared aiohttp.ClientSession
+            queue: Work queue of sitemap URLs
+        """
+        while True:
+            sitemap_url = await queue.get()
+            try:
+                # Be respectful per host rather than per worker
+                await self._throttle(sitemap_url)
+                result = await self.parse_sitemap(http, sitemap_url)
+
+                self.processed_sitemaps.add(sitemap_url)
+                self.pdf_urls.update(result['pdfs'])
+                for nested_sitemap in result['sitemaps']:
+                    if nested_sitemap not in self.visited_sitemaps:
+                        self.visited_sitemaps.add(nested_sitemap)
+                        queue.put_nowait(nested_sitemap)
+
+                logger.info(f"Processed {sitemap_url}: found {len(result['pdfs'])} PDFs, {len(result['sitemaps'])} nested sitemaps")
+            except Exception as e:
+                error_msg = f"Error processing {sitemap_url}: {e}"
+                logger.error(error_msg)
+                self.errors.append(error_msg)
+            finally:
+                queue.task_done()
+
+    async def _crawl_async(self, initial_sitemaps: List[str]):
+        """
+        Run the sitemap BFS on one event loop
+
+        Args:
+            initial_sitemaps: Seed sitemap URLs from discovery
+        """
+        queue = asyncio.Queue()
+        for sitemap_url in initial_sitemaps:
+            if sitemap_url not in self.visited_sitemaps:
+                self.visited_sitemaps.add(sitemap_url)
+                queue.put_nowait(sitemap_url)
+
+        self._parse_pool = ThreadPoolExecutor(max_workers=self.max_workers)
+        connector = aiohttp.TCPConnector(limit=self.max_concurrency, ttl_dns_cache=600)
+        timeout = aiohttp.ClientTimeout(total=15)
+        try:
+            async with aiohttp.ClientSession(
+                connector=connector,
+                timeout=timeout,
+                headers=dict(self.session.headers)
+            ) as http:
+                workers = [
+                    asyncio.create_task(self.crawl_sitemap_worker(http, queue))
+                    for _ in range(self.max_concurrency)
+                ]
+                await queue.join()
+                for worker in workers:
+                    worker.cancel()
+        finally:
+            self._parse_pool.shutdown(wait=True)
+
     def crawl_recursive(self) -> SitemapResult:
         """
         Recursively crawl all sitemaps and find PDF URLs
-        
+
+        Fetching is pure I/O, so sitemaps are crawled with asyncio + aiohttp
+        (up to max_concurrency requests in flight) while XML parsing runs in
+        a small thread pool off the event loop.
+
         Returns:
             SitemapResult containing all discovered information
         """
         logger.info(f"Starting recursive crawl of {self.base_url}")
-        
+
         # Discover initial sitemaps
         initial_sitemaps = self.discover_sitemaps()
         if not initial_sitemaps:
             logger.warning("No sitemaps discovered!")
             return SitemapResult(set(), set(), set(), ["No sitemaps found"])
-        
-        with self._lock:
-            self.pending_sitemaps.update(initial_sitemaps)
-        
-        # Process sitemaps recursively
-        while self.pending_sitemaps:
-            # Get current batch of pending sitemaps
-            with self._lock:
-                current_batch = list(self.pending_sitemaps - self.processed_sitemaps)
-                self.pending_sitemaps.clear()
-            
-            if not current_batch:
-                break
-            
-            logger.info(f"Processing batch of {len(current_batch)} sitemaps")
-            
-            # Process batch using thread pool
-            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
-                future_to_sitemap = {
-                    executor.submit(self.crawl_sitemap_worker, sitemap_url): sitemap_url
-                    for sitemap_url in current_batch
-                }
-                
-                for future in as_completed(future_to_sitemap):
-                    sitemap_url = future_to_sitemap[future]
-                    try:
-                        future.result()
-                    except Exception as e:
-                        error_msg = f"Error processing {sitemap_url}: {e}"
-                        logger.error(error_msg)
-                        with self._lock:
-                            self.errors.append(error_msg)
-        
+
+        asyncio.run(self._crawl_async(initial_sitemaps))
+
         # Create final result
         result = SitemapResult(
             pdf_urls=self.pdf_urls.copy(),
@@ -359,7 +540,9 @@ def main():
     parser = argparse.ArgumentParser(description="Recursively crawl sitemaps to find PDF URLs")
     parser.add_argument("url", help="Homepage URL to start crawling from")
     parser.add_argument("--output", "-o", default="pdf_urls.txt", help="Output file for PDF URLs")
-    parser.add_argument("--workers", "-w", type=int, default=5, help="Number of concurrent workers")
+    parser.add_argument("--workers", "-w", type=int, default=None,
+                        help="Number of XML parsing threads (default: one per core)")
+    parser.add_argument("--concurrency", "-c", type=int, default=100, help="Maximum concurrent sitemap fetches")
     parser.add_argument("--delay", "-d", type=float, default=1.0, help="Delay between requests in seconds")
     parser.add_argument("--verbose", "-v", action="store_true", help="Enable verbose logging")
     
@@ -369,7 +552,8 @@ def main():
         logging.getLogger().setLevel(logging.DEBUG)
     
     # Create and run crawler
-    crawler = SitemapCrawler(args.url, max_workers=args.workers, delay=args.delay)
+    crawler = SitemapCrawler(args.url, max_workers=args.workers, delay=args.delay,
+                             max_concurrency=args.concurrency)
     result = crawler.crawl_recursive()
     
     # Print summary